@@ -1,13 +1,17 @@
 import streamlit as st
 import os
-import tempfile
+import logging
+import re
 from dotenv import load_dotenv
 import google.generativeai as genai
-import time
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Configure logging
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+logger = logging.getLogger(__name__)
+
 # Set page configuration
 st.set_page_config(
     page_title="Medical Report Analyzer",
@@ -56,9 +60,6 @@ st.markdown("""
         color: red;
         font-weight: bold;
     }
-    .stProgress > div > div > div > div {
-        background-color: #1E88E5;
-    }
     .upload-section {
         background-color: #f5f5f5;
         padding: 20px;
@@ -68,25 +69,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def process_pdf_with_gemini(uploaded_file):
-    """Process the PDF file using Google Gemini API"""
-    # Get API key from environment variable
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        st.error("❌ Gemini API key not found in .env file. Please add GEMINI_API_KEY to your .env file.")
-        return None
-    
-    # Initialize Gemini API
-    genai.configure(api_key=api_key)
-    
-    # Save uploaded file to a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-        temp_file.write(uploaded_file.getvalue())
-        temp_path = temp_file.name
-    
-    try:
-        # System prompt for Gemini
-        system_instruction = """🔹 Task:
+# Gemini model used for the analysis
+MODEL_NAME = "gemini-2.0-flash"
+
+# System prompt for Gemini
+SYSTEM_INSTRUCTION = """🔹 Task:
     Analyze the provided biomarker data and generate a structured, human-friendly medical report.
 
     ### ***Instructions***:
@@ -144,70 +131,104 @@ def process_pdf_with_gemini(uploaded_file):
     - Do this step for all biomarker present
     - Do it as the example is given
     - **Cholesterol:** 🔴 (High) → Risk of heart issues. Try adding fiber (oats, nuts), avoid fried food."""
-        
-        # Create a Gemini model
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        
-        # Create a generation config
-        generation_config = {
-            "temperature": 1.0,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        }
-        
-        # Generate content with progress bar
+
+# Generation config for Gemini
+GENERATION_CONFIG = {
+    "temperature": 1.0,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+@st.cache_resource
+def get_model(api_key, model_name, system_instruction, generation_config):
+    """Configure the Gemini API and build the model once per process.
+
+    The model settings are arguments so that they are part of the cache key.
+    """
+    # Initialize Gemini API
+    genai.configure(api_key=api_key)
+    
+    # Create a Gemini model with the prompt as its system instruction
+    return genai.GenerativeModel(
+        model_name,
+        system_instruction=system_instruction,
+        generation_config=generation_config,
+    )
+
+@st.cache_data(ttl=86400, max_entries=512, show_spinner=False)
+def analyze_pdf_with_gemini(pdf_bytes, model_name, system_instruction, generation_config, _api_key):
+    """Run the Gemini analysis for the given PDF bytes.
+
+    Results are cached on the PDF content together with the model name, system
+    instruction and generation config, so re-uploading the same report returns
+    the previous analysis without another API call, while changing the model
+    setup invalidates it. The model is built here from those same settings, so
+    the cache key always matches the model that produced the result. The API
+    key is not hashed (leading underscore).
+    """
+    # The body only runs on a cache miss; a hit logs nothing
+    logger.info("Analysis cache miss for %d-byte PDF", len(pdf_bytes))
+    
+    model = get_model(_api_key, model_name, system_instruction, generation_config)
+    
+    # Generate the content
+    response = model.generate_content(
+        contents=[
+            {
+                "parts": [
+                    {"inline_data": {"mime_type": "application/pdf", "data": pdf_bytes}}
+                ]
+            }
+        ]
+    )
+    
+    # Extract the result
+    return response.text
+
+def process_pdf_with_gemini(uploaded_file):
+    """Process the PDF file using Google Gemini API.
+
+    Returns None after showing a specific error when the upload is rejected or
+    the analysis fails.
+    """
+    # Check the PDF signature rather than trusting the file extension; readers
+    # accept up to 1024 bytes of leading junk before the header
+    pdf_bytes = uploaded_file.getvalue()
+    if b"%PDF-" not in pdf_bytes[:1024]:
+        st.error("❌ The uploaded file is not a valid PDF.")
+        return None
+    
+    # Get API key from environment variable
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        st.error("❌ Gemini API key not found in .env file. Please add GEMINI_API_KEY to your .env file.")
+        return None
+    
+    try:
+        # Generate content while showing a spinner
         with st.spinner("Analyzing medical report... This may take a minute"):
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.03)  # Simulate processing time
-                progress_bar.progress(i + 1)
-            
-            # Use the correct method to process the PDF
-            with open(temp_path, 'rb') as f:
-                pdf_data = f.read()
-            
-            # Generate the content
-            response = model.generate_content(
-                contents=[
-                    {
-                        "parts": [
-                            {"text": system_instruction},
-                            {"inline_data": {"mime_type": "application/pdf", "data": pdf_data}}
-                        ]
-                    }
-                ],
-                generation_config=generation_config
+            result = analyze_pdf_with_gemini(
+                pdf_bytes, MODEL_NAME, SYSTEM_INSTRUCTION, GENERATION_CONFIG, api_key
             )
-            
-            # Extract the result
-            result = response.text
-        
-        # Clean up the temporary file
-        os.unlink(temp_path)
         
         return result
     
     except Exception as e:
-        # Clean up temp file
-        try:
-            os.unlink(temp_path)
-        except:
-            pass
-        
         st.error(f"❌ Error analyzing the report: {str(e)}")
         return None
 
+# Traffic light indicators and the CSS class used to color each of them
+INDICATOR_CLASSES = {"🟢": "normal", "🟡": "borderline", "🔴": "concerning"}
+INDICATOR_PATTERN = re.compile(r"🟢 \(Normal\)|🟡 \(Borderline\)|🔴 \((?:Low|High|Concerning)\)")
+
 def render_markdown_with_colored_indicators(text):
     """Format the text with colored indicators"""
-    # Replace specific indicators with colored spans
-    text = text.replace("🟢 (Normal)", "<span class='normal'>🟢 (Normal)</span>")
-    text = text.replace("🟡 (Borderline)", "<span class='borderline'>🟡 (Borderline)</span>")
-    text = text.replace("🔴 (Low)", "<span class='concerning'>🔴 (Low)</span>")
-    text = text.replace("🔴 (High)", "<span class='concerning'>🔴 (High)</span>")
-    text = text.replace("🔴 (Concerning)", "<span class='concerning'>🔴 (Concerning)</span>")
-    
-    return text
+    # Wrap every indicator in a colored span in a single pass
+    return INDICATOR_PATTERN.sub(
+        lambda m: f"<span class='{INDICATOR_CLASSES[m.group()[0]]}'>{m.group()}</span>",
+        text,
+    )
 
 def main():
     # App Header
@@ -265,7 +286,8 @@ def main():
                 file_name="medical_report_analysis.md",
                 mime="text/markdown",
             )
-        else:
+        elif result is not None:
+            # None means a specific error was already shown
             st.error("Failed to analyze the report. Please try again.")
 
 if __name__ == "__main__":